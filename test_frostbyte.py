@@ -1,8 +1,13 @@
 """Tests for FrostByte daemon — HIGH fixes and MEDIUM bug verification."""
 
+import contextlib
+import errno
 import json
+import math
 import os
+import select
 import signal
+import struct
 import subprocess
 import sys
 import tempfile
@@ -141,6 +146,102 @@ class TestAudioAncestorExpansion:
         assert 200 in d._audio_pids
 
 
+class TestAudioWatcher:
+    """A long-lived pactl subscribe keeps audio PIDs current without
+    forking pactl on every scan."""
+
+    # fake server: announces a stream, then removes it, then exits
+    FAKE = [sys.executable, "-u", "-c",
+            "import time\n"
+            "print(\"Event 'new' on sink-input #7\")\n"
+            "print(\"Event 'change' on sink #0\")\n"
+            "time.sleep(0.3)\n"
+            "print(\"Event 'remove' on sink-input #7\")\n"
+            "time.sleep(0.3)\n"]
+
+    def _wait(self, fd):
+        poller = select.poll()
+        poller.register(fd)
+        assert poller.poll(5000)
+
+    def _next(self, w, fd):
+        # lines may arrive split across reads — wait for the next verdict
+        while True:
+            self._wait(fd)
+            r = w.read()
+            if r is not False:
+                return r
+
+    def test_events_from_fake_server(self):
+        lists = iter([{}, {7: 1234}])
+        w = fb._AudioWatcher(lambda: next(lists))
+        with mock.patch.object(fb._AudioWatcher, "SUBSCRIBE", self.FAKE):
+            fd = w.start()
+        try:
+            assert self._next(w, fd) is True and w.streams == {7: 1234}
+            assert self._next(w, fd) is True and w.streams == {}
+            assert self._next(w, fd) is None  # subscriber exited
+        finally:
+            w.stop()
+
+    def test_relists_only_for_new_streams(self):
+        lister = mock.Mock(return_value={7: 1234, 8: 5678})
+        w = fb._AudioWatcher(lister)
+        r, wr = os.pipe()
+        os.set_blocking(r, False)
+        w._proc = mock.Mock()
+        w._proc.stdout.fileno.return_value = r
+        w.streams = {7: 1234}
+        try:
+            os.write(wr, b"Event 'change' on sink-input #7\n" * 50)
+            assert w.read() is False
+            lister.assert_not_called()
+            os.write(wr, b"Event 'new' on sink-input #8\n"
+                         b"Event 'change' on sink-input #8\n")
+            assert w.read() is True and w.streams == {7: 1234, 8: 5678}
+            assert lister.call_count == 1
+            os.write(wr, b"Event 'remove' on sink-input #7\n")
+            assert w.read() is True and w.streams == {8: 5678}
+            assert lister.call_count == 1
+        finally:
+            os.close(r)
+            os.close(wr)
+
+    def test_daemon_falls_back_when_watcher_exits(self):
+        d = _make_daemon()
+        with mock.patch.object(fb._AudioWatcher, "SUBSCRIBE",
+                               [sys.executable, "-c", "pass"]), \
+             mock.patch.object(d, "_list_sink_inputs", return_value={}):
+            d._start_audio_watch()
+            assert d._audio is not None
+            self._wait(d._audio_fd)
+            d._on_audio_event()
+        assert d._audio is None and d._audio_fd not in d._io_handlers
+        assert d._audio_retry_at > time.monotonic()
+
+    def test_update_uses_watcher_without_forking(self):
+        d = _make_daemon()
+        d._ppid_map = {1: [3000], 3000: [5000]}
+        d._audio = fb._AudioWatcher(lambda: None)
+        d._audio.streams = {42: 5000}
+        with mock.patch("subprocess.run") as run:
+            d._update_audio()
+        run.assert_not_called()
+        assert d._audio_pids == {5000, 3000}
+        d._audio = None
+
+    def test_list_sink_inputs_maps_index_to_pid(self):
+        d = _make_daemon()
+        out = ("Sink Input #42\n"
+               "\tProperties:\n"
+               '\t\tapplication.process.id = "5000"\n'
+               "Sink Input #43\n"
+               '\t\tapplication.process.id = "6000"\n')
+        with mock.patch("subprocess.run",
+                        return_value=mock.Mock(returncode=0, stdout=out)):
+            assert d._list_sink_inputs() == {42: 5000, 43: 6000}
+
+
 # ═══════════════════════════════════════════════════════════════
 # HIGH #2: Hot reload calls _validate_config
 # ═══════════════════════════════════════════════════════════════
@@ -369,6 +470,91 @@ class TestStaleFrozenAt:
         assert pid not in d._frozen_at, "should be purged from _frozen_at"
 
 
+# ═══════════════════════════════════════════════════════════════
+# Incremental scanner: static fields cached per (pid, starttime)
+# ═══════════════════════════════════════════════════════════════
+
+
+class TestIncrementalScan:
+    """scan() should read status/cmdline once per process lifetime."""
+
+    def _fake_proc(self, procs):
+        """procs: {pid: (comm, state, starttime, uid)} → (read_file, reads)."""
+        reads = []
+
+        def fake_read(path):
+            reads.append(path)
+            _, _, pid_s, kind = path.split("/")
+            comm, state, start, uid = procs[int(pid_s)]
+            if kind == "stat":
+                fields = [state, "1"] + ["0"] * 20
+                fields[11], fields[12] = "100", "50"
+                fields[19] = str(start)
+                fields[21] = "25600"
+                return f"{pid_s} ({comm}) " + " ".join(fields)
+            if kind == "status":
+                return f"Uid:\t{uid}\t{uid}\t{uid}\t{uid}\nTgid:\t{pid_s}\n"
+            return f"/usr/bin/{comm}\0--flag"
+
+        return fake_read, reads
+
+    def _scan(self, d, procs):
+        fake_read, reads = self._fake_proc(procs)
+        with mock.patch("os.listdir", return_value=[str(p) for p in procs]), \
+             mock.patch.object(fb, "_read_file", side_effect=fake_read):
+            d.scan()
+        return reads
+
+    def test_known_process_only_rereads_stat(self):
+        d = _make_daemon()
+        uid = os.getuid()
+        procs = {100: ("app", "S", 500, uid)}
+        first = self._scan(d, procs)
+        assert "/proc/100/status" in first
+        assert "/proc/100/cmdline" in first
+        second = self._scan(d, procs)
+        assert second == ["/proc/100/stat"]
+        assert d.procs[100].cmdline == "/usr/bin/app --flag"
+
+    def test_foreign_process_classified_once(self):
+        d = _make_daemon()
+        procs = {200: ("other", "S", 700, os.getuid() + 1)}
+        self._scan(d, procs)
+        assert 200 not in d.procs
+        second = self._scan(d, procs)
+        assert second == ["/proc/200/stat"]
+
+    def test_recycled_pid_reclassified(self):
+        d = _make_daemon()
+        uid = os.getuid()
+        self._scan(d, {100: ("app", "T", 500, uid)})
+        d.frozen.add(100)
+        d._frozen_at[100] = time.time()
+        d.procs[100].frozen = True
+        # same PID, new starttime → a different process
+        reads = self._scan(d, {100: ("app", "S", 900, uid)})
+        assert "/proc/100/status" in reads
+        assert d.procs[100].starttime == 900
+        assert 100 not in d.frozen
+        assert 100 not in d._frozen_at
+
+    def test_exec_refreshes_name_and_cmdline(self):
+        d = _make_daemon()
+        uid = os.getuid()
+        self._scan(d, {100: ("sh", "S", 500, uid)})
+        reads = self._scan(d, {100: ("firefox", "S", 500, uid)})
+        assert "/proc/100/cmdline" in reads
+        assert d.procs[100].name == "firefox"
+        assert d.procs[100].cmdline == "/usr/bin/firefox --flag"
+
+    def test_state_stored_in_proc(self):
+        d = _make_daemon()
+        self._scan(d, {100: ("app", "T", 500, os.getuid())})
+        assert d.procs[100].state == "T"
+        self._scan(d, {100: ("app", "S", 500, os.getuid())})
+        assert d.procs[100].state == "S"
+
+
 # ═══════════════════════════════════════════════════════════════
 # MEDIUM #4: Notification rate limiting
 # ═══════════════════════════════════════════════════════════════
@@ -508,6 +694,109 @@ class TestAtomicStatusWrite:
                 assert data["frozen"][0]["name"] == "app"
 
 
+class TestChangeOnlyStatus:
+    """The status file is rewritten only when its content changes."""
+
+    def _daemon(self):
+        d = _make_daemon()
+        d.frozen = {100}
+        d.procs = {100: fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                                rss_mb=150, last_active=time.time(),
+                                frozen=True)}
+        return d
+
+    def test_unchanged_status_not_rewritten(self, tmp_path):
+        d = self._daemon()
+        status_file = tmp_path / "frostbyte-status.json"
+        with mock.patch.object(fb, "STATUS_FILE", status_file):
+            d._write_status()
+            assert json.loads(status_file.read_text())["seq"] == 1
+            status_file.unlink()
+            d._wakeups["total"] = 99  # counters alone are not a change
+            d._write_status()
+            assert not status_file.exists()
+
+    def test_change_bumps_seq(self, tmp_path):
+        d = self._daemon()
+        status_file = tmp_path / "frostbyte-status.json"
+        with mock.patch.object(fb, "STATUS_FILE", status_file):
+            d._write_status()
+            d.frozen.clear()
+            d._write_status()
+        data = json.loads(status_file.read_text())
+        assert data["seq"] == 2 and data["frozen"] == []
+
+    def test_seq_continues_across_restart(self, tmp_path):
+        status_file = tmp_path / "frostbyte-status.json"
+        status_file.write_text(json.dumps({"frozen": [], "seq": 41}))
+        d = self._daemon()
+        with mock.patch.object(fb, "STATUS_FILE", status_file):
+            d._write_status()
+        assert json.loads(status_file.read_text())["seq"] == 42
+
+
+class TestMetrics:
+    """Opt-in OpenMetrics file fed by instrumented hot paths."""
+
+    def test_histogram_rendering(self):
+        m = fb._Metrics()
+        m.observe("scan_duration_seconds", 0.0002)
+        m.observe("scan_duration_seconds", 0.03)
+        m.inc("freezes")
+        text = m.render({"processes": 7}, {"total": 3, "scan": 2})
+        lines = text.splitlines()
+        assert 'frostbyte_scan_duration_seconds_bucket{le="0.0005"} 1' in lines
+        assert 'frostbyte_scan_duration_seconds_bucket{le="0.05"} 2' in lines
+        assert 'frostbyte_scan_duration_seconds_bucket{le="+Inf"} 2' in lines
+        assert "frostbyte_scan_duration_seconds_count 2" in lines
+        assert "frostbyte_freezes_total 1" in lines
+        assert 'frostbyte_wakeups_total{cause="scan"} 2' in lines
+        assert "frostbyte_processes 7" in lines
+        assert lines[-1] == "# EOF"
+
+    def test_hot_paths_instrumented(self):
+        d = _make_daemon()
+        d.procs[100] = fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                               rss_mb=200, last_active=time.time())
+        with mock.patch("os.kill"), \
+             mock.patch.object(fb, "_pidfd_open", return_value=None):
+            d.freeze_pid(100)
+            d._handle_focus(100)
+        d._check_freeze()
+        hists = d._metrics.hists
+        assert hists["freeze_duration_seconds"][-1] == 1
+        assert hists["thaw_duration_seconds"][-1] == 1
+        assert hists["focus_thaw_latency_seconds"][-1] == 1
+        assert hists["check_freeze_duration_seconds"][-1] == 1
+        assert hists["match_duration_seconds"][-1] >= 1
+        assert d._metrics.counters == {"freezes": 1, "thaws": 1}
+
+    def test_file_written_only_when_enabled(self, tmp_path):
+        metrics_file = tmp_path / "frostbyte-metrics.prom"
+        d = _make_daemon()
+        with mock.patch.object(fb, "METRICS_FILE", metrics_file):
+            d._write_metrics()
+            assert not metrics_file.exists()
+            d.config["metrics"] = True
+            d._write_metrics()
+        text = metrics_file.read_text()
+        assert "# TYPE frostbyte_frozen_rss_bytes gauge" in text
+        assert text.endswith("# EOF\n")
+
+    def test_frozen_rss_is_current_rss(self, tmp_path):
+        metrics_file = tmp_path / "frostbyte-metrics.prom"
+        d = _make_daemon(metrics=True)
+        d.procs = {100: fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                                rss_mb=150, last_active=0, frozen=True,
+                                frozen_rss_mb=400)}
+        d.frozen = {100}
+        with mock.patch.object(fb, "METRICS_FILE", metrics_file):
+            d._write_metrics()
+        text = metrics_file.read_text()
+        assert "frostbyte_frozen_rss_bytes %d\n" % (150 * 1048576) in text
+        assert "frostbyte_reclaimed_bytes %d\n" % (250 * 1048576) in text
+
+
 # ═══════════════════════════════════════════════════════════════
 # Existing functionality regression tests
 # ═══════════════════════════════════════════════════════════════
@@ -539,6 +828,49 @@ class TestWhitelist:
         assert "chrome" not in d.config["whitelist"]
 
 
+class TestCompiledMatcher:
+    """Whitelist compiles to one regex; verdicts are memoized per Proc."""
+
+    def _proc(self, name="firefox", cmdline="/usr/lib/firefox/firefox"):
+        return fb.Proc(pid=1, name=name, cmdline=cmdline, cpu=0, rss_mb=500,
+                       last_active=0)
+
+    def test_matches_name_and_argv_basenames(self):
+        d = _make_daemon(whitelist=["Code", "steam", "a.b"])
+        assert d._is_whitelisted("code", "")
+        assert d._is_whitelisted("bash", "bash /opt/steam/steam.sh")
+        assert not d._is_whitelisted("python3", "python3 /opt/steam/x.py")
+        assert not d._is_whitelisted("axb", "axb")  # patterns are literal
+
+    def test_verdict_cached(self):
+        d = _make_daemon(whitelist=["firefox"],
+                         rules=[{"pattern": "fire", "min_rss_mb": 10}])
+        p = self._proc()
+        assert d._proc_whitelisted(p) and p.rule["min_rss_mb"] == 10
+        with mock.patch.object(d, "_is_whitelisted") as slow:
+            for _ in range(3):
+                assert d._proc_whitelisted(p)
+        slow.assert_not_called()
+
+    def test_whitelist_edit_invalidates(self):
+        d = _make_daemon(whitelist=[])
+        p = self._proc()
+        assert not d._proc_whitelisted(p)
+        with mock.patch.object(d, "_save_config"):
+            d.add_to_whitelist("firefox")
+        assert d._proc_whitelisted(p)
+
+    def test_reload_invalidates(self, tmp_path):
+        d = _make_daemon(whitelist=[])
+        p = self._proc()
+        assert not d._proc_whitelisted(p)
+        cfg = tmp_path / "config.json"
+        cfg.write_text(json.dumps({"whitelist": ["firefox"]}))
+        with mock.patch.object(fb, "CONFIG_FILE", cfg):
+            d._reload_config_if_changed()
+        assert d._proc_whitelisted(p)
+
+
 class TestPerAppRules:
     def test_compile_rules_valid(self):
         d = _make_daemon(rules=[
@@ -574,6 +906,474 @@ class TestIsStopped:
                                side_effect=FileNotFoundError):
             assert not d._is_stopped(123)
 
+    def test_tracked_process_reads_live_state(self):
+        d = _make_daemon()
+        d.procs[123] = fb.Proc(pid=123, name="vim", cmdline="vim", cpu=0,
+                               rss_mb=10, last_active=0, state="S")
+        with mock.patch.object(fb, "_read_file",
+                               return_value="123 (vim) T 1 0 0 0"):
+            assert d._is_stopped(123)  # ^Z after the last scan
+            assert d._find_stopped_ancestor(123) == 123
+        assert d.procs[123].state == "T"
+        with mock.patch.object(fb, "_read_file",
+                               return_value="123 (vim) S 1 0 0 0"):
+            assert not d._is_stopped(123)  # continued by someone else
+
+
+class TestProcTree:
+    """scan() indexes the process tree once; queries do no /proc I/O."""
+
+    def test_descendants_size_depth(self):
+        tree = fb._ProcTree({1: [10, 20], 10: [11, 12], 12: [13]})
+        assert tree.descendants(10) == [11, 12, 13]
+        assert tree.descendants(1) == [10, 11, 12, 13, 20]
+        assert tree.size(10) == 4 and tree.size(13) == 1
+        assert tree.depth[13] == 3
+        assert tree.descendants(999) == [] and tree.size(999) == 1
+
+    def test_deep_chain_no_recursion(self):
+        n = 10000
+        tree = fb._ProcTree({i: [i + 1] for i in range(2, n)})
+        assert tree.size(2) == n - 1
+        assert tree.depth[n] == n - 2
+
+    def test_cycle_terminates(self):
+        tree = fb._ProcTree({100: [200], 200: [100]})
+        assert set(tree.descendants(100)) | {100} == {100, 200}
+
+    def test_lineage_uses_index(self):
+        d = _make_daemon()
+        d._ppid_map = {1: [10], 10: [20], 20: [30]}
+        for pid in (10, 20, 30):
+            d.procs[pid] = fb.Proc(pid=pid, name="app", cmdline="app", cpu=0,
+                                   rss_mb=10, last_active=0)
+        with mock.patch.object(fb, "_read_file",
+                               side_effect=AssertionError("no /proc I/O")):
+            assert list(d._lineage(30)) == [30, 20, 10]
+            d.frozen.add(10)
+            assert d._find_stopped_ancestor(30) == 10
+
+    def test_thaw_order_leaves_first(self):
+        d = _make_daemon()
+        d._ppid_map = {1: [10], 10: [20, 21], 20: [30]}
+        for pid in (10, 20, 21, 30):
+            d.procs[pid] = fb.Proc(pid=pid, name="app", cmdline="app", cpu=0,
+                                   rss_mb=10, last_active=0, frozen=True,
+                                   state="T")
+            d.frozen.add(pid)
+        sent = []
+        with mock.patch.object(d, "_send_signal",
+                               side_effect=lambda p, sig: sent.append(p)), \
+             mock.patch("time.sleep"):
+            d.thaw_pid(30)
+        assert sent[-1] == 10 and set(sent[:2]) == {30, 21}
+        assert not d.frozen
+
+
+class TestSyntheticProcfs:
+    """scan() and friends run unchanged against a generated PROC_ROOT,
+    which is what `frostbyte bench` measures."""
+
+    def _fs(self, tmp_path, **kw):
+        fs = fb._SyntheticProcfs(tmp_path, seed=1)
+        fs.populate(**kw)
+        return fs
+
+    def _scan(self, d, fs):
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)):
+            d.scan()
+
+    def test_scan_sees_own_leaders_only(self, tmp_path):
+        fs = self._fs(tmp_path, procs=300, tabs=20, depth=5, threads=30)
+        d = _make_daemon()
+        self._scan(d, fs)
+        mine = {pid for pid, r in fs.procs.items()
+                if r["uid"] == os.getuid() and r["tgid"] == pid}
+        assert set(d.procs) == mine
+        assert len(d._ignored) == len(fs.procs) - len(mine)
+        assert d._tree.size(fs.browser) == 5 + 20  # depth-1 helpers + tabs + root
+
+    def test_warm_scan_reads_stat_only(self, tmp_path):
+        fs = self._fs(tmp_path, procs=200, tabs=10, threads=20)
+        d = _make_daemon()
+        self._scan(d, fs)
+        reads = []
+        real = fb._read_file
+        with mock.patch.object(fb, "_read_file",
+                               side_effect=lambda p: reads.append(p) or real(p)):
+            self._scan(d, fs)
+        assert reads and all(r.endswith("/stat") for r in reads)
+
+    def test_churn_and_signals(self, tmp_path):
+        fs = self._fs(tmp_path, procs=200, tabs=10, threads=10, foreign=0)
+        d = _make_daemon()
+        self._scan(d, fs)
+        before = set(d.procs)
+        fs.churn(0.1)
+        self._scan(d, fs)
+        assert set(d.procs) == {pid for pid, r in fs.procs.items()
+                                if r["tgid"] == pid}
+        assert len(before - set(d.procs)) == len(set(d.procs) - before) == 20
+        d._open_pidfd = lambda pid: None
+        d._send_signal = fs.signal
+        d.freeze_pid(fs.browser)
+        self._scan(d, fs)
+        assert d.procs[fs.browser].state == "T"
+        assert fs.procs[fs.browser]["state"] == "T"
+
+    def test_bench_reports_every_operation(self):
+        rows = fb._bench(procs=150, runs=1)
+        ops = [r["op"] for r in rows]
+        assert ops[0] == "scan (cold)" and "thaw_pid (browser tree)" in ops
+        assert all(r["mean_ms"] >= 0 and r["peak_kb"] > 0 for r in rows)
+        assert fb.PROC_ROOT == "/proc"
+        thaw, = [r for r in rows if r["op"] == "thaw_pid (browser tree)"]
+        assert thaw["mean_ms"] < 1000 * fb.FrostByteDaemon._THAW_ROOT_PAUSE
+
+
+def _proc_event(what, pid, parent=0, tgid=None):
+    """One netlink proc connector datagram, as the kernel sends it."""
+    tgid = pid if tgid is None else tgid
+    if what == fb._PROC_EVENT_FORK:
+        data = struct.pack("=IIII", parent, parent, pid, tgid)
+    else:
+        data = struct.pack("=IIII", pid, tgid, 0, 0)
+    ev = struct.pack("=IIQ", what, 0, 0) + data
+    cn = struct.pack("=IIIIHH", fb._CN_IDX_PROC, 1, 0, 0, len(ev), 0) + ev
+    return struct.pack("=IHHII", 16 + len(cn), fb._NLMSG_DONE, 0, 0, 0) + cn
+
+
+class TestActivityScoring:
+    """activity_model "scored": EWMA rates over the app tree against noise
+    floors, so a periodic timer tick no longer counts as use."""
+
+    def _daemon(self, tmp_path, **cfg):
+        d = _make_daemon(activity_model="scored", **cfg)
+        now = time.time()
+        d.procs = {
+            100: fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                         rss_mb=300, last_active=now - 3600),
+            101: fb.Proc(pid=101, name="app", cmdline="app --type=worker",
+                         cpu=0, rss_mb=20, last_active=now - 3600),
+        }
+        d._ppid_map = {1: [100], 100: [101]}
+        return d
+
+    def _rounds(self, d, tmp_path, ticks, rounds=6, start=None, step=30.0):
+        """Score `rounds` scans, `step` s apart, with ticks[pid] each."""
+        now = start or time.time() - rounds * step
+        with mock.patch.object(fb, "PROC_ROOT", str(tmp_path)):
+            for _ in range(rounds):
+                for pid, t in ticks.items():
+                    d.procs[pid].cpu_delta += t
+                d._score_activity(now)
+                now += step
+        return now - step
+
+    def test_timer_tick_is_not_activity(self, tmp_path):
+        d = self._daemon(tmp_path)
+        self._rounds(d, tmp_path, {100: 1})  # one tick per scan
+        assert time.time() - d.procs[100].last_active > 3000
+
+    def test_busy_child_keeps_app_active(self, tmp_path):
+        d = self._daemon(tmp_path)
+        last = self._rounds(d, tmp_path, {101: 300})  # worker at 10% CPU
+        assert d.procs[100].last_active == last
+        assert d.procs[101].cpu_rate > d.config["activity_cpu_percent"]
+
+    def test_io_counts_as_activity(self, tmp_path):
+        d = self._daemon(tmp_path)
+        status = tmp_path / "100" / "status"
+        io = tmp_path / "100" / "io"
+        status.parent.mkdir()
+        now = time.time() - 120
+        with mock.patch.object(fb, "PROC_ROOT", str(tmp_path)):
+            for i in range(5):
+                status.write_text("Name:\tapp\nvoluntary_ctxt_switches:\t5\n"
+                                  "nonvoluntary_ctxt_switches:\t900000\n")
+                io.write_text(f"rchar: {i * 50 << 20}\nwchar: 0\n")
+                d._score_activity(now + i * 30)
+        assert d.procs[100].cs == 5 and d.procs[100].cs_rate == 0
+        assert d.procs[100].io_rate > 1024
+        assert d.procs[100].last_active == now + 120
+
+    def test_counters_reprimed_after_leaving_probe(self, tmp_path):
+        d = self._daemon(tmp_path)
+        (tmp_path / "100").mkdir()
+        status = tmp_path / "100" / "status"
+        (tmp_path / "100" / "io").write_text("rchar: 0\nwchar: 0\n")
+        now = time.time() - 7200
+        idle_since = d.procs[100].last_active
+        with mock.patch.object(fb, "PROC_ROOT", str(tmp_path)):
+            status.write_text("Name:\tapp\nvoluntary_ctxt_switches:\t5\n")
+            d._score_activity(now)
+            d.procs[100].frozen = True  # hours outside the probe
+            d._score_activity(now + 30)
+            d.procs[100].frozen = False
+            status.write_text("Name:\tapp\nvoluntary_ctxt_switches:\t500000\n")
+            d._score_activity(now + 7200)
+            d._score_activity(now + 7230)  # no switches since re-priming
+        assert d.procs[100].cs == 500000 and d.procs[100].cs_rate == 0
+        assert d.procs[100].last_active == idle_since
+
+    def test_rule_raises_noise_floor(self, tmp_path):
+        d = self._daemon(tmp_path, rules=[
+            {"pattern": "^app$", "activity_cpu_percent": 50}])
+        self._rounds(d, tmp_path, {100: 300})
+        assert time.time() - d.procs[100].last_active > 3000
+
+
+class TestProcEvents:
+    """Fork/exec/exit from the proc connector keep the table current
+    between scans; /proc is then listed only to reconcile."""
+
+    def _setup(self, tmp_path):
+        fs = fb._SyntheticProcfs(tmp_path, seed=2)
+        fs.populate(procs=120, tabs=8, depth=3, threads=10)
+        d = _make_daemon()
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)):
+            d.scan()
+        return fs, d
+
+    def _deliver(self, d, fs, *datagrams):
+        d._proc_sock = mock.Mock()
+        d._proc_sock.recv.side_effect = list(datagrams) + [BlockingIOError()]
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)):
+            d._on_proc_events()
+
+    def test_parse_keeps_processes_drops_threads(self):
+        buf = (_proc_event(fb._PROC_EVENT_FORK, 501, parent=500)
+               + _proc_event(fb._PROC_EVENT_FORK, 502, parent=500, tgid=500)
+               + _proc_event(fb._PROC_EVENT_EXEC, 501)
+               + _proc_event(fb._PROC_EVENT_EXIT, 502, tgid=500))
+        assert fb._parse_proc_events(buf) == [
+            (fb._PROC_EVENT_FORK, 501, 500), (fb._PROC_EVENT_EXEC, 501, 0)]
+
+    def test_fork_and_exit_track_table_and_tree(self, tmp_path):
+        fs, d = self._setup(tmp_path)
+        child = fs.spawn("renderer", ppid=fs.browser, rss_mb=80)
+        self._deliver(d, fs, _proc_event(fb._PROC_EVENT_FORK, child, fs.browser))
+        assert child in d.procs and child in d._children(fs.browser)
+        fs.exit(child)
+        self._deliver(d, fs, _proc_event(fb._PROC_EVENT_EXIT, child))
+        assert child not in d.procs and child not in d._children(fs.browser)
+
+    def test_child_of_frozen_app_stopped_on_fork(self, tmp_path):
+        fs, d = self._setup(tmp_path)
+        d.frozen.add(fs.browser)
+        d._frozen_at[fs.browser] = 123.0
+        child = fs.spawn("renderer", ppid=fs.browser)
+        with mock.patch.object(d, "_send_signal") as sig, \
+             mock.patch.object(d, "_open_pidfd"):
+            self._deliver(d, fs, _proc_event(fb._PROC_EVENT_FORK, child, fs.browser))
+        sig.assert_called_once_with(child, signal.SIGSTOP)
+        assert child in d.frozen and d._frozen_at[child] == 123.0
+
+    def test_tree_patched_in_place_and_fork_inherits_image(self, tmp_path):
+        fs, d = self._setup(tmp_path)
+        tree = d._tree
+        child = fs.spawn(d.procs[fs.browser].name, ppid=fs.browser)
+        with mock.patch.object(d, "_classify") as classify:
+            self._deliver(d, fs, _proc_event(fb._PROC_EVENT_FORK, child, fs.browser))
+        assert not classify.called  # same image as its parent until exec
+        assert d._tree is tree and tree.parent[child] == fs.browser
+        assert d.procs[child].cmdline == d.procs[fs.browser].cmdline
+        assert tree.size(fs.browser) == len(d._children(fs.browser)) + 1
+
+    def test_system_daemon_routes_events_by_owner(self, tmp_path):
+        fs, mine = self._setup(tmp_path)
+        theirs = _make_daemon()
+        theirs.uid = os.getuid() + 1
+        sd = fb._SystemDaemon()
+        sd.users = {mine.uid: mine, theirs.uid: theirs}
+        forked = fs.spawn("renderer", ppid=fs.browser)
+        orphan = fs.spawn("worker", ppid=1, uid=theirs.uid)  # parent untracked
+        sd._proc_sock = mock.Mock()
+        sd._proc_sock.recv.side_effect = [
+            _proc_event(fb._PROC_EVENT_FORK, forked, fs.browser)
+            + _proc_event(fb._PROC_EVENT_FORK, orphan, 1),
+            OSError(errno.ENOBUFS, "No buffer space available")]
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)):
+            sd._on_proc_events()
+        assert forked in mine.procs and forked not in theirs.procs
+        assert orphan in theirs.procs and orphan not in mine.procs
+        assert theirs._scans_since_walk == fb.FrostByteDaemon._RECONCILE_SCANS
+
+    def test_full_walk_only_to_reconcile(self, tmp_path):
+        fs, d = self._setup(tmp_path)
+        d._proc_events_on = True
+        d._scans_since_walk = 0
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)), \
+             mock.patch.object(fb.os, "listdir", wraps=os.listdir) as ls:
+            for _ in range(fb.FrostByteDaemon._RECONCILE_SCANS + 1):
+                d.scan()
+        assert ls.call_count == 1
+        mine = {pid for pid, r in fs.procs.items()
+                if r["uid"] == os.getuid() and r["tgid"] == pid}
+        assert set(d.procs) == mine
+
+
+class TestSystemWide:
+    """`run --system`: one root process serving every logged-in user."""
+
+    def _served(self, tmp_path, uid):
+        pw = mock.Mock(pw_dir=str(tmp_path / "home"), pw_gid=uid)
+        cfg = {**fb.DEFAULT_CONFIG, "notifications": False}
+        return [mock.patch.object(fb.pwd, "getpwuid", return_value=pw),
+                mock.patch.object(fb, "USER_RUNTIME_ROOT", tmp_path / "run"),
+                mock.patch.object(fb.FrostByteDaemon, "_load_config",
+                                  return_value=cfg)]
+
+    def test_served_user_files_live_with_that_user(self, tmp_path):
+        uid = os.getuid() + 1
+        patches = self._served(tmp_path, uid)
+        for p in patches:
+            p.start()
+        try:
+            d = fb.FrostByteDaemon(uid=uid)
+        finally:
+            for p in patches:
+                p.stop()
+        assert d._rt(fb.JOURNAL_FILE) == (tmp_path / "run" / str(uid)
+                                          / fb.JOURNAL_FILE.name)
+        assert d._cfg(fb.CONFIG_FILE) == (tmp_path / "home" / ".config"
+                                          / "frostbyte" / fb.CONFIG_FILE.name)
+        own = _make_daemon()
+        assert own._rt(fb.JOURNAL_FILE) == fb.JOURNAL_FILE
+        pw = mock.Mock(pw_dir="/home/u", pw_gid=uid, pw_name="u")
+        with mock.patch.object(fb.pwd, "getpwuid", return_value=pw):
+            kw = d._as_user()
+        assert (kw["user"], kw["group"], kw["extra_groups"]) == (uid, uid, [])
+        assert kw["env"]["HOME"] == "/home/u" and "SUDO_USER" not in kw["env"]
+        assert kw["env"]["XDG_RUNTIME_DIR"] == str(tmp_path / "run" / str(uid))
+        assert own._as_user() == {}
+
+    def test_log_and_default_config_go_to_served_user(self, tmp_path):
+        uid = os.getuid() + 1
+        patches = self._served(tmp_path, uid)
+        for p in patches:
+            p.start()
+        try:
+            d = fb.FrostByteDaemon(uid=uid)
+        finally:
+            for p in patches:
+                p.stop()
+        d._as_owner = contextlib.nullcontext
+        conf = tmp_path / "home" / ".config" / "frostbyte"
+        with mock.patch.object(fb.logging, "basicConfig") as basic:
+            d._save_default_config()
+            d._setup_logging()
+        log_file = basic.call_args.kwargs["handlers"][0]
+        log_file.close()
+        assert log_file.baseFilename == str(conf / fb.LOG_FILE.name)
+        assert json.loads((conf / fb.CONFIG_FILE.name).read_text()) == \
+            fb.DEFAULT_CONFIG
+
+    def test_shared_walk_partitions_by_owner(self, tmp_path):
+        fs = fb._SyntheticProcfs(tmp_path, seed=3)
+        fs.populate(procs=200, tabs=10, depth=3, threads=10, foreign=0.5)
+        walker = fb._SharedWalk()
+        uid = os.getuid()
+        d = _make_daemon()
+        d._walker = walker
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)):
+            mine = {pid for pid, _ in walker.entries(uid)}
+            theirs = {pid for pid, _ in walker.entries(uid + 1)}
+            d.scan()
+        assert walker.walks == 1  # both users served from one listing
+        assert mine == {pid for pid, r in fs.procs.items() if r["uid"] == uid}
+        assert theirs and theirs == set(fs.procs) - mine
+        assert set(d.procs) == {pid for pid in mine
+                                if fs.procs[pid]["tgid"] == pid}
+
+    def test_foreign_pids_are_never_continued(self, tmp_path):
+        (tmp_path / "4242").mkdir()  # root's stopped process, e.g. under gdb
+        d = _make_daemon()
+        d.uid = os.getuid() + 1
+        d.procs[5000] = fb.Proc(pid=5000, name="xterm", cmdline="xterm",
+                                cpu=0, rss_mb=10, last_active=0)
+        d._tree = fb._ProcTree({4242: [5000]})
+        with mock.patch.object(fb, "PROC_ROOT", str(tmp_path)), \
+             mock.patch.object(d, "_is_stopped", return_value=True), \
+             mock.patch.object(d, "_send_signal") as sig:
+            for msg in ("thaw 4242", "focus 4242", "focus 5000"):
+                d._handle_message(msg)
+            d.thaw_pid(4242)
+            assert d._find_stopped_ancestor(5000) == 5000
+        assert all(c.args[0] != 4242 for c in sig.call_args_list)
+
+    def test_user_instance_defers_to_system_daemon(self, tmp_path, capsys):
+        (tmp_path / str(os.getpid())).mkdir()
+        (tmp_path / str(os.getpid()) / "cmdline").write_text("frostbyte\0run")
+        (tmp_path / "pid").write_text(str(os.getpid()))
+        d = _make_daemon()
+        owner = (tmp_path / str(os.getpid())).stat().st_uid
+        with mock.patch.object(fb, "PROC_ROOT", str(tmp_path)), \
+             mock.patch.object(fb, "PID_FILE", tmp_path / "pid"), \
+             mock.patch.object(fb.os, "getuid", return_value=owner + 1), \
+             pytest.raises(SystemExit) as exc:
+            d._check_already_running()
+        assert exc.value.code == 0  # not a failure: no restart loop
+        assert "system-wide" in capsys.readouterr().out
+
+    @pytest.mark.skipif(os.geteuid() != 0, reason="needs root")
+    def test_writes_do_not_follow_user_symlinks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chmod(tmp, 0o711)  # like /run/user: the user may traverse
+            self._check_symlink_write(Path(tmp))
+
+    def _check_symlink_write(self, tmp_path):
+        uid = 65534
+        run = tmp_path / "run" / str(uid)
+        run.mkdir(parents=True)
+        run.parent.chmod(0o755)
+        os.chown(run, uid, uid)
+        secret = tmp_path / "shadow"
+        secret.write_text("root:x\n")
+        secret.chmod(0o600)
+        (run / fb.STATUS_FILE.with_suffix(".tmp").name).symlink_to(secret)
+        d = _make_daemon()
+        d.uid, d._gid, d._runtime_dir = uid, uid, run
+        assert not d._publish_status({"frozen": []})
+        assert secret.read_text() == "root:x\n" and secret.stat().st_uid == 0
+        d._status_last = None
+        (run / fb.STATUS_FILE.with_suffix(".tmp").name).unlink()
+        assert d._publish_status({"frozen": []})
+        assert (run / fb.STATUS_FILE.name).stat().st_uid == uid
+        assert os.geteuid() == 0 and open(secret).read()  # privileges restored
+
+    def test_sync_follows_logins(self, tmp_path):
+        run = tmp_path / "run"
+        for name in ("999", "1000", "1001", "seat0"):
+            (run / name).mkdir(parents=True)
+        patches = self._served(tmp_path, 1000) + [
+            mock.patch.object(fb.FrostByteDaemon, "_start"),
+            mock.patch.object(fb.FrostByteDaemon, "_clean_exit"),
+            mock.patch.object(fb.FrostByteDaemon, "_as_owner",
+                              lambda self: contextlib.nullcontext()),
+        ]
+        for p in patches:
+            p.start()
+        try:
+            sd = fb._SystemDaemon()
+            sd._sync_users()
+            assert set(sd.users) == {1000, 1001}
+            assert (tmp_path / "home" / ".config" / "frostbyte"
+                    / fb.CONFIG_FILE.name).exists()  # theirs, not root's
+            assert (run / "1000" / fb.PID_FILE.name).read_text() == str(os.getpid())
+            assert all(d._walker is sd._walker and d._poller is sd._poller
+                       for d in sd.users.values())
+            gone = sd.users[1001]
+            for f in (run / "1001").iterdir():
+                f.unlink()
+            (run / "1001").rmdir()
+            sd._sync_users()
+            assert set(sd.users) == {1000}
+            gone._clean_exit.assert_called_once()
+        finally:
+            for p in patches:
+                p.stop()
+
 
 class TestFreezeThaw:
     def test_freeze_pid(self):
@@ -583,7 +1383,9 @@ class TestFreezeThaw:
             rss_mb=200, last_active=time.time(),
         )
         d._ppid_map = {}
-        with mock.patch("os.kill") as mock_kill:
+        # no pidfd support → plain os.kill fallback
+        with mock.patch("os.kill") as mock_kill, \
+             mock.patch.object(fb, "_pidfd_open", return_value=None):
             d.freeze_pid(100, reason="test")
             mock_kill.assert_called_with(100, signal.SIGSTOP)
         assert 100 in d.frozen
@@ -609,6 +1411,936 @@ class TestFreezeThaw:
         assert 100 not in d._frozen_at
 
 
+@pytest.mark.skipif(fb._pidfd_open(os.getpid()) is None,
+                    reason="pidfds unavailable")
+class TestPidfdHandles:
+    """Frozen processes are pinned by a pidfd: signals cannot hit a
+    recycled PID and exit is noticed without a rescan."""
+
+    def _spawn(self, d):
+        child = subprocess.Popen(["sleep", "30"])
+        _, f = fb._parse_stat(fb._read_file(f"/proc/{child.pid}/stat"))
+        d.procs[child.pid] = fb.Proc(
+            pid=child.pid, name="sleep", cmdline="sleep 30", cpu=0,
+            rss_mb=200, last_active=time.time(), starttime=int(f[19]),
+        )
+        return child
+
+    def _state(self, pid, want_stopped):
+        # signal delivery is asynchronous — give the scheduler a moment
+        for _ in range(200):
+            state = fb._parse_stat(fb._read_file(f"/proc/{pid}/stat"))[1][0]
+            if (state == "T") == want_stopped:
+                break
+            time.sleep(0.005)
+        return state
+
+    def test_freeze_thaw_through_pidfd(self):
+        d = _make_daemon()
+        child = self._spawn(d)
+        try:
+            with mock.patch("os.kill") as mock_kill:
+                d.freeze_pid(child.pid)
+                assert child.pid in d._pidfds
+                assert self._state(child.pid, True) == "T"
+                d.thaw_pid(child.pid)
+            mock_kill.assert_not_called()
+            assert child.pid not in d._pidfds
+            assert self._state(child.pid, False) != "T"
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_exit_observed_without_scan(self):
+        d = _make_daemon()
+        child = self._spawn(d)
+        d.freeze_pid(child.pid)
+        child.kill()
+        child.wait()
+        for fd, _ev in d._poller.poll(1000):
+            d._io_handlers[fd]()
+        assert child.pid not in d.frozen
+        assert child.pid not in d.procs
+        assert d._pidfds == {}
+
+    def test_recycled_pid_not_signalled(self):
+        d = _make_daemon()
+        child = self._spawn(d)
+        d.procs[child.pid].starttime += 1  # scan saw a different process
+        try:
+            with mock.patch("os.kill") as mock_kill, \
+                 mock.patch("signal.pidfd_send_signal") as mock_send:
+                d.freeze_pid(child.pid)
+            mock_kill.assert_not_called()
+            mock_send.assert_not_called()
+            assert child.pid not in d.frozen
+            assert d._pidfds == {}
+        finally:
+            child.kill()
+            child.wait()
+
+
+@pytest.mark.skipif(fb._pidfd_open(os.getpid()) is None,
+                    reason="pidfds unavailable")
+class TestFreezeJournal:
+    """A restarted daemon re-adopts what it froze instead of thawing it."""
+
+    def _daemon(self):
+        d = _make_daemon()
+        d._journal_on = True
+        return d
+
+    def _spawn(self, d):
+        return TestPidfdHandles()._spawn(d)
+
+    def _rescan(self, d, child):
+        TestPidfdHandles()._state(child.pid, True)
+        d.procs[child.pid].state = "T"
+
+    def test_restart_readopts_with_original_timestamp(self, tmp_path):
+        journal = tmp_path / "journal"
+        with mock.patch.object(fb, "JOURNAL_FILE", journal):
+            old = self._daemon()
+            child = self._spawn(old)
+            try:
+                old.freeze_pid(child.pid, reason="idle")
+                at = json.loads(journal.read_text())["at"]
+                new = self._daemon()
+                new.procs[child.pid] = old.procs[child.pid]
+                self._rescan(new, child)
+                assert new._replay_journal() == 1
+                assert child.pid in new.frozen and child.pid in new._pidfds
+                assert new._frozen_at[child.pid] == at
+            finally:
+                child.kill()
+                child.wait()
+
+    def test_thaw_and_reused_pid_not_adopted(self, tmp_path):
+        journal = tmp_path / "journal"
+        with mock.patch.object(fb, "JOURNAL_FILE", journal):
+            d = self._daemon()
+            child = self._spawn(d)
+            try:
+                d.freeze_pid(child.pid)
+                d.thaw_pid(child.pid)
+                d.freeze_pid(child.pid)
+                new = self._daemon()
+                new.procs[child.pid] = d.procs[child.pid]
+                self._rescan(new, child)
+                new.procs[child.pid].starttime += 1  # a different process now
+                assert new._replay_journal() == 0
+                assert new.frozen == set()
+                assert journal.read_text() == ""  # compacted
+            finally:
+                child.kill()
+                child.wait()
+
+    def test_torn_line_and_thaw_record(self, tmp_path):
+        journal = tmp_path / "journal"
+        journal.write_text(
+            '{"op": "freeze", "pid": 100, "start": 5, "at": 1.0, "reason": ""}\n'
+            '{"op": "thaw", "pid": 100, "start": 5}\n'
+            '{"op": "freeze", "pid": 200, "start": 7, "at": 2.0, "reason": ""}\n'
+            '{"op": "fre')
+        d = self._daemon()
+        for pid, start in ((100, 5), (200, 7)):
+            d.procs[pid] = fb.Proc(pid=pid, name="app", cmdline="app", cpu=0,
+                                   rss_mb=100, last_active=0, starttime=start,
+                                   state="T")
+        with mock.patch.object(fb, "JOURNAL_FILE", journal), \
+             mock.patch.object(d, "_open_pidfd"):
+            assert d._replay_journal() == 1
+        assert d.frozen == {200} and d._frozen_at[200] == 2.0
+
+    def test_compaction_keeps_live_records(self, tmp_path):
+        journal = tmp_path / "journal"
+        d = self._daemon()
+        d.frozen = {1}
+        d._frozen_at[1] = 3.0
+        d.procs[1] = fb.Proc(pid=1, name="a", cmdline="a", cpu=0, rss_mb=1,
+                             last_active=0, starttime=9)
+        with mock.patch.object(fb, "JOURNAL_FILE", journal):
+            d._journal_freeze([1], "x")
+            for _ in range(100):
+                d._journal_append({"op": "thaw", "pid": 2, "start": 1})
+            assert len(journal.read_text().splitlines()) < 100
+        assert json.loads(journal.read_text().splitlines()[0])["pid"] == 1
+
+
+class TestCgroupFreezer:
+    """freeze_backend=cgroup freezes a dedicated app scope with one write."""
+
+    CG = "/user.slice/app.slice/app-gnome-firefox-42.scope"
+
+    def _setup(self, tmp_path, members, tree):
+        d = _make_daemon(freeze_backend="cgroup")
+        cg_dir = tmp_path / self.CG.lstrip("/")
+        cg_dir.mkdir(parents=True)
+        (cg_dir / "cgroup.procs").write_text("".join(f"{m}\n" for m in members))
+        (cg_dir / "cgroup.freeze").write_text("0\n")
+        # pre-set the state the kernel reports after the write
+        (cg_dir / "cgroup.events").write_text("populated 1\nfrozen 1\n")
+        for pid in members:
+            d.procs[pid] = fb.Proc(pid=pid, name=f"app{pid}", cmdline="app",
+                                   cpu=0, rss_mb=200, last_active=time.time(),
+                                   cgroup=self.CG)
+        d._ppid_map = {tree[0]: tree[1:]}
+        return d, cg_dir
+
+    def test_freeze_writes_cgroup_freeze(self, tmp_path):
+        d, cg_dir = self._setup(tmp_path, [100, 101, 102], [100, 101, 102])
+        with mock.patch.object(fb, "CGROUP_ROOT", tmp_path), \
+             mock.patch.object(fb, "_pidfd_open", return_value=None), \
+             mock.patch("os.kill") as mock_kill:
+            d.freeze_pid(100)
+        mock_kill.assert_not_called()
+        assert (cg_dir / "cgroup.freeze").read_text() == "1\n"
+        assert d.frozen == {100, 101, 102}
+        assert all(d.procs[p].state == "T" for p in (100, 101, 102))
+
+    def test_thaw_writes_zero(self, tmp_path):
+        d, cg_dir = self._setup(tmp_path, [100, 101], [100, 101])
+        with mock.patch.object(fb, "CGROUP_ROOT", tmp_path), \
+             mock.patch.object(fb, "_pidfd_open", return_value=None), \
+             mock.patch.object(d, "_is_own_process", return_value=True), \
+             mock.patch("os.kill") as mock_kill:
+            d.freeze_pid(100)
+            (cg_dir / "cgroup.events").write_text("populated 1\nfrozen 0\n")
+            d.thaw_pid(101)
+        mock_kill.assert_not_called()
+        assert (cg_dir / "cgroup.freeze").read_text() == "0\n"
+        assert d.frozen == set()
+        assert d._frozen_cgroups == {}
+
+    def test_shared_scope_falls_back_to_signals(self, tmp_path):
+        # 200 lives in the same scope but is not part of 100's tree
+        d, cg_dir = self._setup(tmp_path, [100, 200], [100])
+        with mock.patch.object(fb, "CGROUP_ROOT", tmp_path), \
+             mock.patch.object(fb, "_pidfd_open", return_value=None), \
+             mock.patch("os.kill") as mock_kill:
+            d.freeze_pid(100)
+        mock_kill.assert_called_once_with(100, signal.SIGSTOP)
+        assert (cg_dir / "cgroup.freeze").read_text() == "0\n"
+
+    def test_external_cgroup_thaw_detected(self, tmp_path):
+        d, cg_dir = self._setup(tmp_path, [100], [100])
+        with mock.patch.object(fb, "CGROUP_ROOT", tmp_path), \
+             mock.patch.object(fb, "_pidfd_open", return_value=None):
+            d.freeze_pid(100)
+            (cg_dir / "cgroup.events").write_text("populated 1\nfrozen 0\n")
+            d._sync_frozen_cgroups()
+        assert 100 not in d.frozen
+        assert d._frozen_cgroups == {}
+
+    def test_read_cgroup_requires_app_unit(self):
+        d = _make_daemon(freeze_backend="cgroup")
+        with mock.patch.object(fb, "_read_file",
+                               return_value="0::/user.slice/session-2.scope\n"):
+            assert d._read_cgroup(1) == ""
+        with mock.patch.object(fb, "_read_file", return_value=f"0::{self.CG}\n"):
+            assert d._read_cgroup(1) == self.CG
+
+    def test_unknown_backend_falls_back(self):
+        d = _make_daemon(freeze_backend="bogus")
+        assert d.config["freeze_backend"] == "signal"
+
+
+class TestActiveReclaim:
+    """reclaim_after_freeze pages frozen apps out at a throttled rate."""
+
+    def test_cgroup_memory_reclaim_throttled(self, tmp_path):
+        d = _make_daemon(reclaim_after_freeze=True, reclaim_mb_per_sec=64,
+                         poll_interval=1)
+        cg = "/app.slice/app-foo.scope"
+        cg_dir = tmp_path / cg.lstrip("/")
+        cg_dir.mkdir(parents=True)
+        (cg_dir / "memory.current").write_text(str(100 * 1048576))
+        (cg_dir / "memory.reclaim").write_text("")
+        d._frozen_cgroups[cg] = {100}
+        d._pid_cgroup[100] = cg
+        d.frozen.add(100)
+        with mock.patch.object(fb, "CGROUP_ROOT", tmp_path):
+            d._queue_reclaim(100)
+            d._reclaim_step()
+            assert (cg_dir / "memory.reclaim").read_text() == f"{64 * 1048576}\n"
+            assert len(d._reclaim_queue) == 1  # budget exhausted
+            d._reclaim_step()
+            assert (cg_dir / "memory.reclaim").read_text() == f"{36 * 1048576}\n"
+        assert d._reclaim_queue == []
+
+    def test_process_madvise_pages_out_resident_ranges(self):
+        d = _make_daemon(reclaim_after_freeze=True, reclaim_mb_per_sec=64)
+        d.frozen.add(100)
+        d._pidfds[100] = 7  # fake pidfd
+        ranges = [(0x1000, 0x200000, 2048), (0x400000, 0x100000, 1024)]
+        with mock.patch.object(fb, "_resident_ranges", return_value=ranges), \
+             mock.patch.object(fb, "_process_madvise",
+                               return_value=0x300000) as mock_madv, \
+             mock.patch.object(fb, "_read_file", side_effect=FileNotFoundError):
+            d._queue_reclaim(100)
+            d._reclaim_step()
+        mock_madv.assert_called_once_with(
+            7, [(0x1000, 0x200000), (0x400000, 0x100000)], fb.MADV_PAGEOUT)
+        assert d._reclaim_queue == []
+        d._pidfds.clear()
+
+    def test_madvise_eperm_disables_process_path(self):
+        d = _make_daemon(reclaim_after_freeze=True)
+        d.frozen.add(100)
+        d._pidfds[100] = 7
+        with mock.patch.object(fb, "_resident_ranges",
+                               return_value=[(0x1000, 4096, 4)]), \
+             mock.patch.object(fb, "_process_madvise",
+                               side_effect=PermissionError(1, "denied")), \
+             mock.patch.object(fb, "_read_file", side_effect=FileNotFoundError):
+            d._queue_reclaim(100)
+            d._reclaim_step()
+            d._queue_reclaim(100)
+        assert d._madvise_ok is False
+        assert d._reclaim_queue == []
+        d._pidfds.clear()
+
+    def test_resident_ranges_skip_special_and_locked(self):
+        smaps = (
+            "00400000-00500000 r-xp 00000000 08:01 1 /usr/bin/app\n"
+            "Rss:                 512 kB\n"
+            "VmFlags: rd ex mr mw me\n"
+            "00600000-00700000 rw-p 00000000 00:00 0\n"
+            "Rss:                 256 kB\n"
+            "VmFlags: rd wr mr mw me lo\n"
+            "7fff0000-7fff2000 r--p 00000000 00:00 0 [vvar]\n"
+            "Rss:                   8 kB\n"
+            "00800000-00900000 rw-p 00000000 00:00 0\n"
+            "Rss:                   0 kB\n"
+        )
+        with mock.patch.object(fb, "_read_file", return_value=smaps):
+            assert fb._resident_ranges(1) == [(0x400000, 0x100000, 512)]
+
+    def test_status_reports_measured_reclaim(self, tmp_path):
+        d = _make_daemon()
+        d.frozen = {100}
+        d.procs = {100: fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                                rss_mb=100, last_active=time.time(),
+                                frozen=True, frozen_rss_mb=500)}
+        status_file = tmp_path / "frostbyte-status.json"
+        with mock.patch.object(fb, "STATUS_FILE", status_file):
+            d._write_status()
+        data = json.loads(status_file.read_text())
+        assert data["reclaimed_mb"] == 400
+        assert data["saved_mb"] == 500
+
+
+class TestPssAccounting:
+    """memory_accounting "pss" charges shared pages once, via smaps_rollup."""
+
+    ROLLUP = (
+        "00400000-7fff0000 ---p 00000000 00:00 0 [rollup]\n"
+        "Rss:              409600 kB\n"
+        "Pss:              102400 kB\n"
+        "Pss_Anon:          51200 kB\n"
+        "Shared_Clean:     307200 kB\n"
+        "Private_Clean:     10240 kB\n"
+        "Private_Dirty:     40960 kB\n"
+        "Swap:               2048 kB\n"
+    )
+
+    def _proc(self, pid, rss, **kw):
+        return fb.Proc(pid=pid, name=kw.pop("name", "app"), cmdline="app",
+                       cpu=0, rss_mb=rss, last_active=time.time() - 3600, **kw)
+
+    def test_parse_smaps_rollup(self):
+        with mock.patch.object(fb, "_read_file", return_value=self.ROLLUP):
+            assert fb._read_smaps_rollup(1) == (100.0, 50.0, 2.0)
+
+    def test_only_candidates_read_and_cached(self):
+        d = _make_daemon(memory_accounting="pss", min_rss_mb=100,
+                         whitelist=["keep"])
+        d.procs = {1: self._proc(1, 400), 2: self._proc(2, 50),
+                   3: self._proc(3, 400, name="keep")}
+        with mock.patch.object(fb, "_read_smaps_rollup",
+                               return_value=(100.0, 50.0, 0.0)) as rollup:
+            d._refresh_smaps()
+            rollup.assert_called_once_with(1)
+            d._refresh_smaps()  # RSS unchanged → cached
+            assert rollup.call_count == 1
+            d.procs[1].rss_mb = 480  # drifted > 10%
+            d._refresh_smaps()
+            assert rollup.call_count == 2
+        assert d.procs[1].pss_mb == 100.0 and d.procs[1].uss_mb == 50.0
+
+    def test_freeze_decision_uses_pss(self):
+        d = _make_daemon(memory_accounting="pss", min_rss_mb=150)
+        d.procs = {1: self._proc(1, 400)}
+        with mock.patch.object(fb, "_read_smaps_rollup",
+                               return_value=(100.0, 50.0, 0.0)), \
+             mock.patch.object(d, "freeze_pid") as freeze:
+            d._refresh_smaps()
+            d._check_freeze()
+            freeze.assert_not_called()  # 400 MB RSS but only 100 MB PSS
+            d.config["memory_accounting"] = "rss"
+            d._check_freeze()
+            freeze.assert_called_once()
+
+    def test_status_saved_uses_pss(self, tmp_path):
+        d = _make_daemon(memory_accounting="pss")
+        d.frozen = {1, 2}
+        d.procs = {pid: self._proc(pid, 400, frozen=True, frozen_rss_mb=400)
+                   for pid in (1, 2)}
+        with mock.patch.object(fb, "_read_smaps_rollup",
+                               return_value=(100.0, 50.0, 0.0)):
+            d._refresh_smaps()
+        status_file = tmp_path / "frostbyte-status.json"
+        with mock.patch.object(fb, "STATUS_FILE", status_file):
+            d._write_status()
+        data = json.loads(status_file.read_text())
+        assert data["saved_mb"] == 200  # not 800: shared pages counted once
+        assert data["frozen"][0]["pss_mb"] == 100
+        assert data["frozen"][0]["uss_mb"] == 50
+
+    def test_invalid_mode_falls_back_to_rss(self):
+        d = _make_daemon(memory_accounting="bogus")
+        assert d.config["memory_accounting"] == "rss"
+
+
+class TestMemoryPressure:
+    """A PSI trigger freezes early under pressure; calm RAM backs off scans."""
+
+    def _idle_proc(self, d, minutes):
+        d.procs[100] = fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                               rss_mb=500,
+                               last_active=time.time() - minutes * 60)
+
+    def test_pressure_tightens_threshold(self):
+        d = _make_daemon(freeze_after_minutes=10,
+                         pressure_freeze_after_minutes=2)
+        self._idle_proc(d, 5)
+        with mock.patch.object(d, "freeze_pid") as freeze:
+            d._check_freeze()
+            freeze.assert_not_called()
+            with mock.patch.object(d, "scan"), \
+                 mock.patch.object(d, "_refresh_audio_pids"), \
+                 mock.patch.object(d, "_write_status"):
+                d._on_pressure()
+            freeze.assert_called_once()
+        assert d._under_pressure()
+
+    def test_backs_off_only_when_calm_and_armed(self):
+        d = _make_daemon(scan_interval=30, idle_scan_interval=120)
+        with mock.patch.object(fb, "_mem_available_ratio", return_value=0.8):
+            assert d._next_scan_delay() == 30  # no PSI trigger armed
+            d._psi_fd = 99
+            assert d._next_scan_delay() == 120
+            d._pressure_until = time.monotonic() + 60
+            assert d._next_scan_delay() == 30
+        d._pressure_until = 0.0
+        with mock.patch.object(fb, "_mem_available_ratio", return_value=0.2):
+            assert d._next_scan_delay() == 30
+        d._psi_fd = None
+
+    def test_mem_available_ratio(self):
+        meminfo = ("MemTotal:       16000000 kB\n"
+                   "MemFree:         1000000 kB\n"
+                   "MemAvailable:    4000000 kB\n")
+        with mock.patch.object(fb, "_read_file", return_value=meminfo):
+            assert fb._mem_available_ratio() == 0.25
+        with mock.patch.object(fb, "_read_file", side_effect=OSError):
+            assert fb._mem_available_ratio() == 0.0
+
+    @pytest.mark.skipif(not fb.PSI_MEMORY.exists(), reason="no PSI")
+    def test_trigger_registered_for_pollpri(self, tmp_path):
+        d = _make_daemon()
+        with mock.patch.object(fb, "_RUNTIME_DIR", tmp_path), \
+             mock.patch.object(fb, "SOCKET_FILE", tmp_path / "fb.sock"), \
+             mock.patch.object(fb, "MONITOR_SOCKET", tmp_path / "mon.sock"):
+            d._open_channels()
+            try:
+                if d._psi_fd is None:
+                    pytest.skip("PSI triggers not permitted here")
+                assert d._io_handlers[d._psi_fd] == d._on_pressure
+            finally:
+                d._close_channels()
+        assert d._psi_fd is None
+
+
+class TestScheduler:
+    """run() sleeps until the nearest job deadline instead of ticking."""
+
+    def test_timers_order_and_reschedule(self):
+        t = fb._Timers()
+        t.at("scan", 30.0)
+        t.at("auto_thaw", 10.0)
+        t.at("scan", 5.0)  # pulled forward; the 30.0 entry goes stale
+        assert t.next_deadline() == 5.0
+        assert t.pop_due(12.0) == ["scan", "auto_thaw"]
+        assert t.next_deadline() is None
+        t.at("reclaim", 1.0)
+        t.cancel("reclaim")
+        assert t.pop_due(100.0) == []
+
+    def test_auto_thaw_deadline_from_earliest_freeze(self):
+        d = _make_daemon(max_freeze_hours=4)
+        now = time.time()
+        d._frozen_at = {1: now - 3 * 3600, 2: now - 600}
+        d._schedule_auto_thaw()
+        left = d._timers.get("auto_thaw") - time.monotonic()
+        assert 3590 < left <= 3600
+        d._frozen_at.clear()
+        d._schedule_auto_thaw()
+        assert d._timers.get("auto_thaw") is None
+
+    def test_steppers_armed_only_with_work(self):
+        d = _make_daemon(poll_interval=1)
+        d._arm_steps()
+        assert d._timers.next_deadline() is None
+        d._lazy_thaw_queue = [100]
+        d._arm_steps()
+        assert d._timers.get("lazy_thaw") is not None
+        assert d._timers.get("reclaim") is None
+
+    def test_idle_loop_sleeps_until_scan(self, tmp_path):
+        d = _make_daemon(scan_interval=30, poll_interval=1, max_freeze_hours=4)
+        d._inotify_fd = 5  # event-driven focus channel available
+        polls = []
+
+        def fake_poll(timeout):
+            polls.append(timeout)
+            d._should_exit = True
+            return []
+
+        with mock.patch.object(d, "_check_already_running"), \
+             mock.patch.object(d, "_save_default_config"), \
+             mock.patch.object(d, "_setup_logging"), \
+             mock.patch.object(d, "_ensure_extension"), \
+             mock.patch.object(d, "_open_channels"), \
+             mock.patch.object(d, "_clean_exit"), \
+             mock.patch.object(d, "scan"), \
+             mock.patch.object(d, "_poller", mock.Mock(poll=fake_poll)), \
+             mock.patch.object(fb, "PID_FILE", tmp_path / "pid"), \
+             mock.patch("signal.signal"):
+            d.run()
+        assert polls[0] > 29000  # one wakeup per scan, not per second
+        assert d._wakeups == {"total": 1}
+
+    def test_config_change_event_reloads(self, tmp_path):
+        d = _make_daemon()
+        d._config_fd = 9
+        with mock.patch.object(fb, "_inotify_names",
+                               return_value={fb.CONFIG_FILE.name}), \
+             mock.patch.object(d, "_reload_config_if_changed") as reload:
+            d._drain_config_watch()
+        reload.assert_called_once()
+        d._config_fd = None
+
+
+class TestThawScheduler:
+    """Bulk thaws go through a paced queue instead of one SIGCONT burst."""
+
+    def _daemon(self, **cfg):
+        d = _make_daemon(**cfg)
+        now = time.time()
+        for pid, idle in ((1, 600), (2, 60), (3, 3000)):
+            d.procs[pid] = fb.Proc(pid=pid, name=f"app{pid}", cmdline="app",
+                                   cpu=0, rss_mb=100, last_active=now - idle)
+        d.thawed = []
+        d.thaw_pid = d.thawed.append
+        d._is_stopped = lambda pid: pid not in d.thawed
+        return d
+
+    def test_priority_then_recency(self):
+        d = self._daemon()
+        for pid in (1, 2, 3):
+            d.queue_thaw(pid)
+        d.queue_thaw(3, fb.THAW_USER)  # jumps ahead; old entry goes stale
+        with mock.patch.object(d, "_thaw_cost", return_value=0.0):
+            assert d._thaw_step(math.inf) == 3
+        assert d.thawed == [3, 2, 1]
+        assert d._thaw_queue == [] and d._thaw_queued == {}
+
+    def test_budget_limits_each_step(self):
+        d = self._daemon()
+        for pid in (1, 2, 3):
+            d.queue_thaw(pid)
+        with mock.patch.object(d, "_thaw_cost", return_value=100.0):
+            assert d._thaw_step(150.0) == 1
+            assert d._thaw_step(10.0) == 1  # first app always goes
+            assert d._thaw_step(500.0) == 1
+        assert d.thawed == [2, 1, 3]
+
+    def test_drain_bursts_after_deadline(self):
+        d = self._daemon(poll_interval=1)
+        for pid in (1, 2, 3):
+            d.queue_thaw(pid)
+        clock = [1000.0]
+
+        def sleep(s):
+            clock[0] += s
+        with mock.patch.object(d, "_thaw_budget", return_value=0.0), \
+             mock.patch.object(d, "_thaw_cost", return_value=100.0), \
+             mock.patch.object(fb.time, "monotonic", lambda: clock[0]), \
+             mock.patch.object(fb.time, "sleep", sleep):
+            d._drain_thaw_queue()  # starved budget: only the deadline ends it
+        assert sorted(d.thawed) == [1, 2, 3]
+        assert clock[0] - 1000.0 == d._DRAIN_SECONDS
+
+    def test_budget_shrinks_under_memory_pressure(self):
+        d = _make_daemon(thaw_mb_per_sec=200, poll_interval=2)
+        with mock.patch.object(fb, "_mem_available_ratio", return_value=0.8), \
+             mock.patch.object(d, "_under_pressure", return_value=False):
+            assert d._thaw_budget() == 400
+        with mock.patch.object(fb, "_mem_available_ratio", return_value=0.05), \
+             mock.patch.object(d, "_under_pressure", return_value=True):
+            assert d._thaw_budget() == pytest.approx(400 * 0.2 * 0.25)
+        d.config["thaw_mb_per_sec"] = 0
+        assert d._thaw_budget() == math.inf
+
+    def test_auto_thaw_queues_instead_of_bursting(self):
+        d = self._daemon(max_freeze_hours=1)
+        d.frozen = {1, 2}
+        d._frozen_at = {1: time.time() - 7200, 2: time.time() - 60}
+        d._check_auto_thaw()
+        assert d.thawed == [] and set(d._thaw_queued) == {1}
+        d._schedule_auto_thaw()  # the queued app no longer sets the deadline
+        assert d._timers.get("auto_thaw") - time.monotonic() > 3000
+        d._arm_steps()
+        assert d._timers.get("thaw") is not None
+
+
+class TestThawWarmup:
+    """Thawed apps get their swapped ranges prefetched, focused app first,
+    and their major faults are reported either way."""
+
+    def _job(self, root, focused=False):
+        return fb._WarmupJob(root=root, majflt={root: 0}, focused=focused)
+
+    def test_focused_app_prefetched_first(self, tmp_path):
+        d = _make_daemon(warmup_on_thaw=True)
+        d._warmup_queue = [self._job(10), self._job(20, focused=True)]
+        d._warmup_queue.sort(key=lambda j: not j.focused)
+        ranges = {10: [(0x1000, 0x4000, 16)], 20: [(0x8000, 0x2000, 8)]}
+        with mock.patch.object(fb, "_resident_ranges",
+                               side_effect=lambda pid, key: ranges[pid]) as rr, \
+             mock.patch.object(fb, "_pidfd_open",
+                               side_effect=lambda pid: os.open(os.devnull, os.O_RDONLY)), \
+             mock.patch.object(fb, "_process_madvise") as madv:
+            d._warmup_step()
+        assert rr.call_args_list[0] == mock.call(20, "Swap:")
+        assert madv.call_args_list[0][0][1:] == ([(0x8000, 0x2000)], fb.MADV_WILLNEED)
+        assert madv.call_count == 2 and not d._warmup_queue
+        assert d._metrics.counters["warmup_bytes"] == 24 * 1024
+
+    def test_fault_window_starts_at_sigcont(self):
+        d = _make_daemon(warmup_on_thaw=True)
+        before = time.monotonic()
+        d._queue_warmup(10, {10: 0})
+        job, = d._warmup_reports
+        assert d._warmup_queue == [job]  # warm-up still to run...
+        assert before + d._FAULT_WINDOW <= job.report_at <= (
+            time.monotonic() + d._FAULT_WINDOW)  # ...the window already counts
+
+    def test_warmup_and_thaws_share_one_budget(self):
+        d = _make_daemon(warmup_on_thaw=True)
+        d._warmup_queue = [self._job(10)]
+        d.procs[20] = fb.Proc(pid=20, name="b", cmdline="b", cpu=0, rss_mb=500,
+                              last_active=time.time(), state="T")
+        d.queue_thaw(20)
+        with mock.patch.object(d, "_thaw_budget", return_value=4.0), \
+             mock.patch.object(d, "_thaw_cost", return_value=1.0), \
+             mock.patch.object(d, "_is_stopped", return_value=True), \
+             mock.patch.object(d, "thaw_pid") as thaw, \
+             mock.patch.object(fb, "_resident_ranges",
+                               return_value=[(0x1000, 4 << 20, 4096)]), \
+             mock.patch.object(fb, "_pidfd_open",
+                               side_effect=lambda pid: os.open(os.devnull, os.O_RDONLY)), \
+             mock.patch.object(fb, "_process_madvise"):
+            d._warmup_step()  # 4MB of readahead: the whole interval's budget
+            assert d._thaw_step() == 0 and not thaw.called
+            d._swapin_window = 0.0  # next interval
+            assert d._thaw_step() == 1
+
+    def test_eperm_disables_warmup(self):
+        d = _make_daemon(warmup_on_thaw=True)
+        d._warmup_queue = [self._job(10)]
+        err = OSError(errno.EPERM, "Operation not permitted")
+        with mock.patch.object(fb, "_resident_ranges", return_value=[(0, 4096, 4)]), \
+             mock.patch.object(fb, "_pidfd_open",
+                               side_effect=lambda pid: os.open(os.devnull, os.O_RDONLY)), \
+             mock.patch.object(fb, "_process_madvise", side_effect=err):
+            d._warmup_step()
+        assert d._madvise_ok is False and not d._warmup_queue
+        d._queue_warmup(11, {11: 0})
+        assert not d._warmup_queue and d._warmup_reports[-1].root == 11
+
+    def test_thaw_reports_major_faults(self, tmp_path):
+        fs = fb._SyntheticProcfs(tmp_path, seed=4)
+        fs.populate(procs=60, tabs=4, depth=2, threads=0, foreign=0)
+        d = _make_daemon()
+        d._open_pidfd = lambda pid: None
+        d._send_signal = fs.signal
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)), \
+             mock.patch.object(fb.time, "sleep"):
+            d.scan()
+            d.freeze_pid(fs.browser)
+            d.thaw_pid(fs.browser)
+            job, = d._warmup_reports
+            assert job.root == fs.browser and not job.loaded  # warm-up off
+            stat = fs.root / str(fs.browser) / "stat"
+            f = stat.read_text().split(") ")
+            fields = f[1].split()
+            fields[9] = "37"
+            stat.write_text(f"{f[0]}) {' '.join(fields)}\n")
+            job.report_at = 0.0
+            d._job_fault_report()
+        assert d._metrics.counters["thaw_major_faults"] == 37
+        assert not d._warmup_reports
+
+
+class TestFreezePlanner:
+    """target_available_mb: freeze only what the memory target needs,
+    best net gain first, and give it back when headroom returns."""
+
+    def _daemon(self):
+        d = _make_daemon(target_available_mb=4096)
+        old = time.time() - 3600
+        for pid, name, rss in ((10, "big", 2000), (20, "mid", 1000), (30, "small", 500)):
+            d.procs[pid] = fb.Proc(pid=pid, name=name, cmdline=name, cpu=0,
+                                   rss_mb=rss, last_active=old)
+        d._ppid_map = {1: [10, 20, 30]}
+
+        def freeze(pid, reason=""):
+            d.frozen.add(pid)
+            d.procs[pid].frozen = True
+        d.freeze_pid = mock.Mock(side_effect=freeze)
+        d._thaw_cost = lambda pid: 0.0
+        return d
+
+    def test_freezes_only_what_target_needs(self):
+        d = self._daemon()
+        with mock.patch.object(fb, "_mem_available_mb", return_value=3000):
+            d._check_freeze()
+        assert d.frozen == {10} and set(d._planned) == {10}
+        assert "plan: 1096MB short" in d.freeze_pid.call_args[1]["reason"]
+        assert [job.root for job in d._reclaim_queue] == [10]
+        # SIGSTOP alone moved nothing yet: the running reclaim still counts
+        with mock.patch.object(fb, "_mem_available_mb", return_value=3000):
+            d._check_freeze()
+        assert d.frozen == {10}
+
+    def test_without_pageout_one_freeze_per_measurement(self):
+        d = self._daemon()
+        d._madvise_ok = False  # no way to page out
+        with mock.patch.object(fb, "_mem_available_mb", return_value=1000):
+            d._check_freeze()
+            assert d.frozen == {10}
+            d._check_freeze()  # MemAvailable did not move: next best
+        assert d.frozen == {10, 20}
+
+    def test_often_focused_app_ranks_last(self):
+        d = self._daemon()
+        for _ in range(9):
+            d._focus_history.hours.setdefault("big", [0] * 24)[9] += 1
+        assert [r["name"] for r in d._rank_candidates([10, 20, 30])] == \
+            ["mid", "small", "big"]
+        with mock.patch.object(fb, "_mem_available_mb", return_value=3000):
+            d._check_freeze()
+        assert d.frozen == {20, 30}
+
+    def test_headroom_thaws_cheapest_planned_apps(self):
+        d = self._daemon()
+        d.frozen |= {10, 20, 30}
+        d._planned = {10: 2000.0, 20: 1000.0, 30: 500.0}
+        old = time.time() - 3600
+        d._frozen_at = {10: old, 20: old, 30: time.time()}  # 30: just frozen
+        d._thaw_cost = {10: 3000.0, 20: 100.0, 30: 0.0}.get
+        with mock.patch.object(d, "queue_thaw") as thaw:
+            with mock.patch.object(fb, "_mem_available_mb", return_value=4500):
+                d._check_freeze()  # above target, inside the release band
+            assert not thaw.called
+            with mock.patch.object(fb, "_mem_available_mb", return_value=6000):
+                d._check_freeze()
+        thaw.assert_called_once_with(20, reason="plan")
+        assert set(d._planned) == {10, 30} and not d.freeze_pid.called
+
+    def test_status_explains_ranking(self, tmp_path, capsys):
+        d = self._daemon()
+        with mock.patch.object(d, "scan"), \
+             mock.patch.object(d, "_adopt_frozen_cgroups"), \
+             mock.patch.object(fb, "FOCUS_HISTORY_FILE", tmp_path / "h.json"), \
+             mock.patch.object(fb, "_mem_available_mb", return_value=3000):
+            d.print_status()
+        out = capsys.readouterr().out
+        assert "PLAN: keep 4096MB available — 1096MB short" in out
+        plan = out.split("PLAN:")[1].splitlines()[2:5]
+        assert "big" in plan[0] and plan[0].endswith("freeze")
+        assert not plan[1].endswith("freeze")
+
+
+class TestPrethaw:
+    """Focus history predicts the next app; it is thawed ahead of time
+    while memory allows, and hits/misses keep score."""
+
+    def _daemon(self):
+        d = _make_daemon(prethaw=True)
+        now = time.time()
+        for pid, name in ((100, "terminal"), (200, "editor"), (300, "mail")):
+            d.procs[pid] = fb.Proc(pid=pid, name=name, cmdline=name, cpu=0,
+                                   rss_mb=300, last_active=now - 3600)
+        d._ppid_map = {1: [100, 200, 300]}
+        for pid in (200, 300):
+            d.frozen.add(pid)
+            d.procs[pid].frozen = True
+        return d
+
+    def test_predicts_transitions_and_time_of_day(self, tmp_path):
+        h = fb._FocusHistory()
+        for _ in range(6):
+            h.record("terminal", 14)
+            h.record("editor", 14)
+        h.record("terminal", 14)
+        assert h.predict(14, 0.5) == ["editor"]
+        assert fb._FocusHistory().predict(14, 0.5) == []  # nothing learnt yet
+        for _ in range(5):
+            h.record("mail", 9)
+            h.record("news", 20)
+        assert "mail" in h.predict(9, 0.5)
+        h.save(tmp_path / "h.json")
+        again = fb._FocusHistory.load(tmp_path / "h.json")
+        assert again.next == h.next and again.hours == h.hours
+
+    def test_focus_prethaws_likely_next_app(self):
+        d = self._daemon()
+        for _ in range(6):
+            d._focus_history.record("terminal", time.localtime().tm_hour)
+            d._focus_history.record("editor", time.localtime().tm_hour)
+        with mock.patch.object(fb, "_mem_available_ratio", return_value=0.9):
+            d._note_focus(100)
+        assert d._prethawed[200][0] == "editor"
+        assert 200 in d._thaw_queued and 300 not in d._thaw_queued
+        assert d._metrics.counters["prethaws"] == 1
+
+    def test_prediction_runs_after_focus_thaw(self):
+        d = self._daemon()
+        calls = []
+        with mock.patch.object(d, "_find_stopped_ancestor", return_value=200), \
+             mock.patch.object(d, "thaw_pid",
+                               side_effect=lambda pid: calls.append("thaw")), \
+             mock.patch.object(d._metrics, "observe",
+                               side_effect=lambda *a: calls.append(a[0])), \
+             mock.patch.object(d, "_note_focus",
+                               side_effect=lambda pid: calls.append("note")):
+            d._handle_focus(200)
+        assert calls == ["thaw", "focus_thaw_latency_seconds", "note"]
+
+    def test_low_memory_blocks_prethaw(self):
+        d = self._daemon()
+        for _ in range(6):
+            d._focus_history.record("terminal", time.localtime().tm_hour)
+            d._focus_history.record("editor", time.localtime().tm_hour)
+        with mock.patch.object(fb, "_mem_available_ratio", return_value=0.1):
+            d._note_focus(100)
+        assert not d._prethawed and not d._thaw_queued
+
+    def test_hits_and_misses(self):
+        d = self._daemon()
+        now = time.monotonic()
+        d._prethawed = {200: ("editor", now + 600), 300: ("mail", now - 1)}
+        with mock.patch.object(d, "_prethaw"), \
+             mock.patch.object(d, "_save_focus_history"):
+            d._note_focus(200)
+            d._check_prethaw()
+        h = d._focus_history
+        assert (h.hits, h.misses) == (1, 1) and not d._prethawed
+
+
+class TestEventHistory:
+    """Freezes and thaws land in a capped JSONL log and a daily rollup,
+    which `frostbyte history` summarizes without reading the log."""
+
+    def _log(self, tmp_path):
+        return fb._EventLog(tmp_path / "history.jsonl", tmp_path / "days.json")
+
+    def test_log_rotates_at_cap(self, tmp_path):
+        log = self._log(tmp_path)
+        with mock.patch.object(fb._EventLog, "MAX_BYTES", 500):
+            for i in range(20):
+                log.append({"t": time.time(), "op": "freeze", "app": "slack",
+                            "pid": i, "pids": [i], "reason": "idle"})
+        assert (tmp_path / "history.jsonl.1").stat().st_size > 500
+        assert (tmp_path / "history.jsonl").stat().st_size <= 500
+        assert not (tmp_path / "history.jsonl.2").exists()
+        days = fb._EventLog.load_rollup(tmp_path / "days.json")
+        day, = days.values()
+        assert day["slack"]["freezes"] == 20  # rollup outlives rotation
+
+    def test_summary_totals_and_median(self, tmp_path):
+        log = self._log(tmp_path)
+        now = time.time()
+        for secs in (100, 1000, 1100):
+            log.append({"t": now, "op": "thaw", "app": "code", "pid": 1,
+                        "pids": [1], "reason": "focus", "frozen_s": secs,
+                        "mb": 360, "reclaimed_mb": 50})
+        log.append({"t": now, "op": "thaw", "app": "code", "pid": 1, "pids": [1],
+                    "reason": "auto-thaw", "frozen_s": None, "mb": 360,
+                    "reclaimed_mb": 0})
+        old = now - 30 * 86400
+        log.append({"t": old, "op": "freeze", "app": "code", "pid": 1,
+                    "pids": [1], "reason": "idle"})
+        days = fb._EventLog.load_rollup(tmp_path / "days.json")
+        row, = fb._history_summary(days, 7)
+        assert (row["freezes"], row["thaws"], row["auto_thaws"]) == (0, 4, 1)
+        assert row["mb_hours"] == round(360 * 2200 / 3600, 1)
+        assert row["reclaimed_mb"] == 150
+        assert row["median_frozen_s"] == 1.5 * 512  # 1000 s is in [512, 1024)
+        assert fb._history_summary(days, 7, app="slack") == []
+        assert fb._history_summary(days, 60)[0]["freezes"] == 1
+
+    def test_writers_do_not_lose_each_others_counts(self, tmp_path):
+        cli, daemon = self._log(tmp_path), self._log(tmp_path)
+        for log, app in ((daemon, "code"), (cli, "slack"), (daemon, "code")):
+            log.append({"t": time.time(), "op": "freeze", "app": app,
+                        "pid": 1, "pids": [1], "reason": "manual"})
+        day, = fb._EventLog.load_rollup(tmp_path / "days.json").values()
+        assert (day["code"]["freezes"], day["slack"]["freezes"]) == (2, 1)
+
+    def test_thaw_records_reason_and_duration(self, tmp_path):
+        fs = fb._SyntheticProcfs(tmp_path, seed=4)
+        fs.populate(procs=60, tabs=4, depth=2, threads=0, foreign=0)
+        d = _make_daemon(history=True)
+        d._open_pidfd = lambda pid: None
+        d._send_signal = fs.signal
+        with mock.patch.object(fb, "PROC_ROOT", str(fs.root)), \
+             mock.patch.object(fb, "HISTORY_FILE", tmp_path / "h.jsonl"), \
+             mock.patch.object(fb, "HISTORY_DAYS_FILE", tmp_path / "days.json"), \
+             mock.patch.object(fb.time, "sleep"):
+            d._open_history()
+            d.scan()
+            d.freeze_pid(fs.browser)
+            for p in d.frozen:
+                d._frozen_at[p] -= 600
+            d.queue_thaw(fs.browser, reason="auto-thaw")
+            d._drain_thaw_queue()
+        freeze, thaw = [json.loads(line) for line in
+                        (tmp_path / "h.jsonl").read_text().splitlines()]
+        assert freeze["op"] == "freeze" and freeze["reason"] == "idle"
+        assert freeze["pid"] == fs.browser and freeze["rss_mb"] > 0
+        assert thaw["reason"] == "auto-thaw" and thaw["frozen_s"] == 600
+        assert sorted(thaw["pids"]) == sorted(freeze["pids"])
+        assert not d._thaw_reasons
+
+    def test_history_command(self, tmp_path, capsys):
+        log = self._log(tmp_path)
+        log.append({"t": time.time(), "op": "thaw", "app": "slack", "pid": 1,
+                    "pids": [1], "reason": "focus", "frozen_s": 7200,
+                    "mb": 512, "reclaimed_mb": 200})
+        args = mock.Mock(days=7, app=None, json=False)
+        with mock.patch.object(fb, "HISTORY_DAYS_FILE", tmp_path / "days.json"):
+            fb.cmd_history(args)
+            out = capsys.readouterr().out
+            assert "slack" in out and "1024" in out and "1.7h" in out  # [4096, 8192) s
+            args.json = True
+            fb.cmd_history(args)
+        assert json.loads(capsys.readouterr().out)[0]["thaws"] == 1
+
+
 class TestCheckFocusSelectiveThaw:
     """_check_focus should only thaw descendants that FrostByte froze,
     not all stopped descendants (gnome-terminal-server bug)."""
@@ -750,11 +2482,294 @@ class TestLazyThaw:
             assert d._lazy_thaw_queue == []
 
 
+class TestEventChannels:
+    """Focus/thaw requests arrive over a datagram socket (new extension)
+    or via inotify on the legacy files, without polling."""
+
+    def _open(self, d, tmp_path):
+        patches = [
+            mock.patch.object(fb, "_RUNTIME_DIR", tmp_path),
+            mock.patch.object(fb, "SOCKET_FILE", tmp_path / "frostbyte.sock"),
+            mock.patch.object(fb, "MONITOR_SOCKET", tmp_path / "monitor.sock"),
+            mock.patch.object(fb, "FOCUS_FILE", tmp_path / "frostbyte-focus"),
+            mock.patch.object(fb, "THAW_FILE", tmp_path / "frostbyte-thaw"),
+            # host-wide fork/exit traffic would wake the loop under root
+            mock.patch.object(fb, "_proc_connector", return_value=None),
+        ]
+        for p in patches:
+            p.start()
+        d._open_channels()
+        return patches
+
+    def _pump(self, d, timeout_ms=500):
+        for fd, _ev in d._poller.poll(timeout_ms):
+            d._io_handlers[fd]()
+
+    def test_socket_focus_message(self, tmp_path):
+        d = _make_daemon()
+        patches = self._open(d, tmp_path)
+        try:
+            with mock.patch.object(d, "_handle_focus") as mock_focus:
+                c = fb.socket.socket(fb.socket.AF_UNIX, fb.socket.SOCK_DGRAM)
+                c.sendto(b"focus %d\n" % os.getpid(),
+                         str(tmp_path / "frostbyte.sock"))
+                c.close()
+                self._pump(d)
+            mock_focus.assert_called_once_with(os.getpid())
+        finally:
+            d._close_channels()
+            for p in patches:
+                p.stop()
+        assert not (tmp_path / "frostbyte.sock").exists()
+
+    def test_socket_thaw_message(self, tmp_path):
+        d = _make_daemon()
+        patches = self._open(d, tmp_path)
+        try:
+            with mock.patch.object(d, "thaw_pid") as mock_thaw:
+                c = fb.socket.socket(fb.socket.AF_UNIX, fb.socket.SOCK_DGRAM)
+                c.sendto(b"thaw %d\n" % os.getpid(),
+                         str(tmp_path / "frostbyte.sock"))
+                c.sendto(b"garbage", str(tmp_path / "frostbyte.sock"))
+                c.close()
+                self._pump(d)
+            mock_thaw.assert_called_once_with(os.getpid())
+        finally:
+            d._close_channels()
+            for p in patches:
+                p.stop()
+
+    def test_legacy_focus_file_via_inotify(self, tmp_path):
+        d = _make_daemon()
+        patches = self._open(d, tmp_path)
+        try:
+            if d._inotify_fd is None:
+                pytest.skip("inotify unavailable")
+            with mock.patch.object(d, "_handle_focus") as mock_focus:
+                # GLib.file_set_contents writes a temp file and renames it
+                tmp = tmp_path / "frostbyte-focus.XYZ"
+                tmp.write_text("31337\n")
+                tmp.rename(tmp_path / "frostbyte-focus")
+                self._pump(d)
+            mock_focus.assert_called_once_with(31337)
+        finally:
+            d._close_channels()
+            for p in patches:
+                p.stop()
+
+    def test_no_wakeup_without_events(self, tmp_path):
+        d = _make_daemon()
+        patches = self._open(d, tmp_path)
+        try:
+            assert d._poller.poll(50) == []
+        finally:
+            d._close_channels()
+            for p in patches:
+                p.stop()
+
+
+
+class TestMonitorStream:
+    """`frostbyte monitor` attaches to the daemon's snapshot/delta stream
+    instead of scanning /proc a second time."""
+
+    def _daemon(self):
+        d = _make_daemon(min_rss_mb=100)
+        now = time.time()
+        d.procs = {
+            100: fb.Proc(pid=100, name="app", cmdline="app", cpu=0,
+                         rss_mb=300, last_active=now - 600),
+            200: fb.Proc(pid=200, name="small", cmdline="small", cpu=0,
+                         rss_mb=10, last_active=now),
+        }
+        return d
+
+    def _attach(self, d, tmp_path):
+        patches = TestEventChannels()._open(d, tmp_path)
+        link = fb._DaemonLink.connect()
+        assert link is not None
+        TestEventChannels()._pump(d)  # accept → snapshot
+        return patches, link
+
+    def _recv(self, link):
+        for _ in range(100):
+            got = link.poll()
+            if got:
+                return got
+            time.sleep(0.005)
+        return got
+
+    def test_snapshot_then_deltas(self, tmp_path):
+        d = self._daemon()
+        patches, link = self._attach(d, tmp_path)
+        try:
+            assert self._recv(link)
+            assert set(link.rows) == {100, 200}
+            assert link.meta["min_rss_mb"] == 100
+            d.procs[100].state = "T"
+            del d.procs[200]
+            d._publish_monitor()
+            assert self._recv(link)
+            assert link.rows[100]["state"] == "T" and 200 not in link.rows
+            d._publish_monitor()  # nothing changed → nothing sent
+            assert link.poll() is False
+        finally:
+            link.close()
+            d._close_channels()
+            for p in patches:
+                p.stop()
+
+    def test_client_commands_reach_daemon(self, tmp_path):
+        d = self._daemon()
+        patches, link = self._attach(d, tmp_path)
+        try:
+            with mock.patch.object(d, "freeze_pid") as freeze, \
+                 mock.patch.object(d, "thaw_pid") as thaw:
+                link.send("freeze", 100)
+                link.send("thaw", 100)
+                TestEventChannels()._pump(d)
+            freeze.assert_called_once_with(100, reason="monitor")
+            thaw.assert_called_once_with(100)
+        finally:
+            link.close()
+            d._close_channels()
+            for p in patches:
+                p.stop()
+
+    def test_large_snapshot_is_flushed_not_dropped(self, tmp_path):
+        d = self._daemon()
+        for pid in range(1000, 21000):  # a few MB: far past the socket buffer
+            d.procs[pid] = fb.Proc(pid=pid, name=f"worker-{pid:06d}", cmdline="w",
+                                   cpu=0, rss_mb=1, last_active=time.time())
+        patches, link = self._attach(d, tmp_path)
+        try:
+            fd, = d._monitor_clients
+            assert d._monitor_out[fd]  # the socket took only part of it
+            for _ in range(1000):
+                if len(link.rows) == len(d.procs):
+                    break
+                link.poll()
+                TestEventChannels()._pump(d, timeout_ms=10)
+            assert len(link.rows) == len(d.procs) and fd in d._monitor_clients
+            assert not d._monitor_out[fd]
+        finally:
+            link.close()
+            d._close_channels()
+            for p in patches:
+                p.stop()
+
+    def test_no_daemon_means_standalone(self, tmp_path):
+        with mock.patch.object(fb, "MONITOR_SOCKET", tmp_path / "none.sock"):
+            assert fb._DaemonLink.connect() is None
+
+    def test_groups_from_rows(self):
+        now = time.time()
+        rows = [
+            {"pid": 1, "name": "a", "state": "T", "mem_mb": 400,
+             "last_active": now, "whitelisted": False},
+            {"pid": 2, "name": "b", "state": "S", "mem_mb": 300,
+             "last_active": now - 300, "whitelisted": False},
+            {"pid": 3, "name": "b", "state": "S", "mem_mb": 200,
+             "last_active": now - 60, "whitelisted": False},
+            {"pid": 4, "name": "c", "state": "S", "mem_mb": 900,
+             "last_active": now, "whitelisted": True},
+        ]
+        frozen, cands, saved, fg, cg = fb._monitor_groups(
+            rows, {"min_rss_mb": 100}, now)
+        assert [r["pid"] for r in frozen] == [1] and saved == 400
+        assert cg == [{"name": "b", "pids": [2, 3], "total_rss": 500.0,
+                       "max_idle": 5.0}]
+
+
+class _FakeWin:
+    """Records the curses calls a _Canvas flush makes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def erase(self):
+        self.calls.append(("erase",))
+
+    def move(self, y, x):
+        self.calls.append(("move", y))
+
+    def clrtoeol(self):
+        pass
+
+    def addstr(self, y, x, text, attr=0):
+        self.calls.append(("addstr", y, x, text))
+
+    def refresh(self):
+        self.calls.append(("refresh",))
+
+
+class TestCanvas:
+    """The monitor repaints only rows whose content changed."""
+
+    def _frame(self, cv, win, lines, size=(5, 20)):
+        cv.begin(*size)
+        for y, text in enumerate(lines):
+            fb._safe_addstr(cv, y, 0, text)
+        win.calls.clear()
+        return cv.flush(win)
+
+    def test_first_frame_paints_everything(self):
+        cv, win = fb._Canvas(), _FakeWin()
+        assert self._frame(cv, win, ["a", "b", "c"]) == 5
+        assert win.calls[0] == ("erase",) and win.calls[-1] == ("refresh",)
+
+    def test_unchanged_frame_writes_nothing(self):
+        cv, win = fb._Canvas(), _FakeWin()
+        self._frame(cv, win, ["a", "b", "c"])
+        assert self._frame(cv, win, ["a", "b", "c"]) == 0
+        assert win.calls == []
+
+    def test_only_changed_rows_repainted(self):
+        cv, win = fb._Canvas(), _FakeWin()
+        self._frame(cv, win, ["a", "b", "c"])
+        assert self._frame(cv, win, ["a", "B", "c"]) == 1
+        assert [c for c in win.calls if c[0] == "addstr"] == [("addstr", 1, 0, "B")]
+
+    def test_resize_and_invalidate_repaint_all(self):
+        cv, win = fb._Canvas(), _FakeWin()
+        self._frame(cv, win, ["a"])
+        assert self._frame(cv, win, ["a"], size=(6, 20)) == 6
+        cv.invalidate()
+        assert self._frame(cv, win, ["a"], size=(6, 20)) == 6
+
+    def test_clipped_and_out_of_bounds(self):
+        cv, win = fb._Canvas(), _FakeWin()
+        cv.begin(2, 4)
+        fb._safe_addstr(cv, 0, 2, "xyz")
+        fb._safe_addstr(cv, 9, 0, "gone")  # ignored like curses would
+        cv.flush(win)
+        assert ("addstr", 0, 2, "xy") in win.calls
+        assert not any(c[0] == "addstr" and c[1] == 9 for c in win.calls)
+
 # ═══════════════════════════════════════════════════════════════
 # Review #2 MEDIUM fixes
 # ═══════════════════════════════════════════════════════════════
 
 
+class TestMonitorTeardown:
+    """The monitor's SIGWINCH plumbing is undone however it exits."""
+
+    def test_interrupt_restores_signal_state(self):
+        fds = set(os.listdir("/proc/self/fd"))
+        old_winch = signal.getsignal(signal.SIGWINCH)
+        stdscr = mock.MagicMock()
+        with mock.patch.object(fb, "curses") as curses, \
+             mock.patch.object(fb, "FrostByteDaemon"), \
+             mock.patch.object(fb._DaemonLink, "connect",
+                               side_effect=KeyboardInterrupt), \
+             pytest.raises(KeyboardInterrupt):
+            curses.COLORS = 256
+            fb._monitor_tui(stdscr)
+        assert signal.getsignal(signal.SIGWINCH) is old_winch
+        assert signal.set_wakeup_fd(-1) == -1
+        assert set(os.listdir("/proc/self/fd")) == fds
+
+
 class TestScansPerTickInt:
     def test_scans_per_tick_is_int_with_float_config(self):
         """scans_per_tick should always be int even if config values are float."""